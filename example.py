@@ -1,13 +1,19 @@
+import asyncio
 from ina260 import INA260
-from machine import SoftI2C,Pin
-from time import sleep
+from machine import I2C,Pin
 
-i2c=SoftI2C(Pin(22),Pin(21))
+PERIOD_MS=100
+
+i2c=I2C(0,scl=Pin(22),sda=Pin(21),freq=400000)
 ina=INA260(i2c)
-while True:
-    
-    voltage=ina.voltage
-    current=ina.current
-    power=ina.power
-    print(str(current)+'mA,  '+str(voltage)+'V,   '+str(power)+'mW')
-    sleep(0.1)
\ No newline at end of file
+
+async def main():
+    ina.start_sampling(PERIOD_MS)
+    latest=ina.latest
+    while True:
+        sample=latest()
+        if sample is not None:
+            print('%dmA,  %sV,   %dmW' % sample)
+        await asyncio.sleep_ms(PERIOD_MS)
+
+asyncio.run(main())
\ No newline at end of file
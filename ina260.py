@@ -1,6 +1,6 @@
 
 """
-INA250
+INA260
 ------------------------
 Voltage,current and power sensor via i2c bus.
 
@@ -14,14 +14,70 @@ Based on datasheet: https://www.ti.com/lit/ds/symlink/ina260.pdf?ts=165139833990
 
 #--- Imports
 
-from machine import SoftI2C, Pin
+from array import array
+from micropython import const
+import micropython
+import struct
 import time
 
+try:
+    from ina260_native import is_i2c as _native_is_i2c, read_all as _native_read_all  # optional user C module
+except ImportError:
+    _native_is_i2c = None
+
 #--- Registeradresses
 
-_REG_CURRENT = 0x01  # SHUNT VOLTAGE REGISTER (R)
-_REG_BUSVOLTAGE = 0x02  # BUS VOLTAGE REGISTER (R)
-_REG_POWER = 0x03 # POWER REGISTER (R)
+_REG_CONFIG = const(0x00)  # CONFIGURATION REGISTER (R/W)
+_REG_CURRENT = const(0x01)  # SHUNT VOLTAGE REGISTER (R)
+_REG_BUSVOLTAGE = const(0x02)  # BUS VOLTAGE REGISTER (R)
+_REG_POWER = const(0x03) # POWER REGISTER (R)
+_REG_MASK_ENABLE = const(0x06)  # MASK/ENABLE REGISTER (R/W)
+
+#--- Register bits
+
+_MODE_MASK = const(0x0007)  # operating mode bits of the configuration register
+_MODE_SHUTDOWN = const(0x0000)
+_MODE_TRIGGERED = const(0x0003)  # current and voltage, triggered
+_MODE_CONTINUOUS = const(0x0007)  # current and voltage, continuous
+_CVRF = const(0x0008)  # conversion ready flag in the mask/enable register
+
+# conversion time in us and number of averages, indexed by the
+# VBUSCT/ISHCT and AVG fields of the configuration register
+_CONV_TIME_US = (140, 204, 332, 588, 1100, 2116, 4156, 8244)
+_AVG_COUNT = (1, 4, 16, 64, 128, 256, 512, 1024)
+
+
+#--- Conversions
+
+def _register_slots(data):
+    """(register, 2 byte view) pairs of the data registers in a 6 byte buffer"""
+    view = memoryview(data)
+    return (
+        (_REG_CURRENT, view[0:2]),
+        (_REG_BUSVOLTAGE, view[2:4]),
+        (_REG_POWER, view[4:6]),
+    )
+
+def _conversion_time_ms(config):
+    """Duration of one triggered current and voltage conversion in ms"""
+    conv_us = _CONV_TIME_US[(config >> 6) & 0x7] + _CONV_TIME_US[(config >> 3) & 0x7]
+    return (_AVG_COUNT[(config >> 9) & 0x7] * conv_us + 999) // 1000
+
+def _to_current(raw):
+    """Current register value (two's complement) in mA (LSB 1.25 mA = 5/4 mA),
+    truncated towards zero"""
+    raw = (raw ^ 0x8000) - 0x8000
+    if raw < 0:
+        return -((-raw * 5) >> 2)
+    return (raw * 5) >> 2
+
+def _to_voltage(raw):
+    """Bus voltage register value in V"""
+    return round(raw * 0.00125,2)
+
+def _to_power(raw):
+    """Power register value in mW (LSB 10 mW)"""
+    return raw * 10
 
 
 #############################################################################
@@ -33,50 +89,226 @@ class INA260:
 
     """
 
+    # register addresses for read_raw
+    REG_CONFIG = _REG_CONFIG
+    REG_CURRENT = _REG_CURRENT
+    REG_BUSVOLTAGE = _REG_BUSVOLTAGE
+    REG_POWER = _REG_POWER
+    REG_MASK_ENABLE = _REG_MASK_ENABLE
+
     def __init__(self, i2cBus, address=0x40):
         """
         Args:
-            i2cBus: SoftI2C(Pin(*SCLpin*),Pin(*SDApin*))
+            i2cBus: I2C(*id*, scl=Pin(*SCLpin*), sda=Pin(*SDApin*)) or SoftI2C
             address: i2c address in hex (0x40 by default)
         """
         self.i2c = i2cBus
         self.ADDRESS = address
+        self._data = bytearray(6)
+        self._slots = _register_slots(self._data)
+        self._buf = self._slots[0][1]
+        # separate buffer for the background sampler, which can run between
+        # any two bytecodes of a foreground read
+        self._sample_data = bytearray(6)
+        self._sample_slots = _register_slots(self._sample_data)
+        self._config = None
+        self._timer = None
+        self._cur = self._vol = self._pow = None
+        self._wr_idx = 0
+        self._count = 0
+        if _native_is_i2c is not None and _native_is_i2c(i2cBus):
+            self._read_all_raw = self._read_all_native
 
 
+    @micropython.native
     def _issue_measurement(self, writeAddress):
-        """Issue a measurement.
+        """Issue a measurement. Also available as read_raw.
+        Args:
+            writeAddress (int): address to write to, e.g. INA260.REG_CURRENT
+                (0x01), REG_BUSVOLTAGE (0x02) or REG_POWER (0x03)
+        :return: raw 16 bit register value
+        """
+        buf = self._buf
+        self.i2c.readfrom_mem_into(self.ADDRESS, writeAddress, buf)
+        # combined by hand, struct.unpack_from would allocate a result tuple
+        return (buf[0] << 8) | buf[1]
+
+    read_raw = _issue_measurement
+
+    def _write_register(self, writeAddress, value):
+        """Write a 16 bit value to a register.
         Args:
             writeAddress (int): address to write to
-        :return:
+            value (int): value to write
+        """
+        buf = self._buf
+        struct.pack_into('>H', buf, 0, value)
+        self.i2c.writeto_mem(self.ADDRESS, writeAddress, buf)
+
+    def _config_base(self):
+        """Configuration register without the mode bits.
+
+        Read from the INA260 once and cached, the driver only changes the
+        mode bits afterwards.
+        """
+        config = self._config
+        if config is None:
+            config = self._config = self._issue_measurement(_REG_CONFIG) & ~_MODE_MASK
+        return config
+
+    def _read_all_raw(self, data, slots):
+        """Read the current, bus voltage and power registers.
+
+        The INA260 does not auto-increment its register pointer, so the
+        three registers are read back to back into one buffer and decoded
+        together.
+        Args:
+            data (bytearray): 6 byte buffer to read into
+            slots: _register_slots(data)
+        :return: raw 16 bit (current, voltage, power) register values
         """
-        self.i2c.start()
-        self.i2c.writeto_mem(int(self.ADDRESS), int(writeAddress), '')
-        self.i2c.stop()
-        time.sleep_ms(50)
-        data = bytearray(3)
-        self.i2c.readfrom_into(self.ADDRESS, data)
-        raw = (data[0] << 8) + data[1]
-        raw &= 0xFFFF
-        return raw
+        read = self.i2c.readfrom_mem_into
+        addr = self.ADDRESS
+        for reg, slot in slots:
+            read(addr, reg, slot)
+        return struct.unpack('>HHH', data)
+
+    def _read_all_native(self, data, slots):
+        """Read the current, bus voltage and power registers in C.
+
+        Used instead of _read_all_raw when ina260_native is available and
+        the bus is a machine.I2C or SoftI2C.
+        :return: raw 16 bit (current, voltage, power) register values
+        """
+        return _native_read_all(self.i2c, self.ADDRESS)
+
+    def read_all(self):
+        """Read current, bus voltage and power in one go.
+        :return: (current in mA, voltage in V, power in mW)
+        """
+        current, voltage, power = self._read_all_raw(self._data, self._slots)
+        return _to_current(current), _to_voltage(voltage), _to_power(power)
+
+    def oneshot_read(self, timeout_ms=None):
+        """Trigger a single conversion, read it and shut the INA260 down.
+
+        Between calls the INA260 stays in shutdown mode and draws almost no
+        current, the properties keep returning the last conversion.
+        Not available while start_sampling is running.
+        Args:
+            timeout_ms (int): how long to wait for the conversion, by default
+                twice the conversion time set by the configuration register
+        :return: (current in mA, voltage in V, power in mW)
+        """
+        if self._timer is not None:
+            raise RuntimeError('INA260 is sampling, call stop_sampling first')
+        config = self._config_base()
+        conversion_ms = _conversion_time_ms(config)
+        if timeout_ms is None:
+            timeout_ms = 2 * conversion_ms + 10
+        self._write_register(_REG_CONFIG, config | _MODE_TRIGGERED)
+        try:
+            deadline = time.ticks_add(time.ticks_ms(), timeout_ms)
+            # sleep through the conversion instead of polling the bus
+            time.sleep_ms(max(0, min(conversion_ms, timeout_ms)))
+            while not self._issue_measurement(_REG_MASK_ENABLE) & _CVRF:
+                if time.ticks_diff(deadline, time.ticks_ms()) < 0:
+                    raise OSError('INA260 conversion timed out')
+            return self.read_all()
+        finally:
+            self._write_register(_REG_CONFIG, config | _MODE_SHUTDOWN)
+
+    def start_sampling(self, period_ms=100, size=16, timer_id=0):
+        """Sample current, voltage and power in the background.
+
+        A periodic timer schedules a read of all three registers into a ring
+        buffer of the last *size* samples, latest() returns the newest one
+        without touching the bus. The raw register values are kept in one
+        array('H') per quantity, 6 bytes per sample. Puts the INA260 into
+        continuous mode. oneshot_read is not available while sampling, the
+        properties, read_all and read_raw can still be used.
+        Args:
+            period_ms (int): sample period in ms
+            size (int): number of samples kept in the ring buffer
+            timer_id (int): id of the machine.Timer to use
+        """
+        if size < 1:
+            raise ValueError('size must be at least 1')
+        self.stop_sampling()
+        self._write_register(_REG_CONFIG, self._config_base() | _MODE_CONTINUOUS)
+        self._cur = array('H', bytes(2 * size))
+        self._vol = array('H', bytes(2 * size))
+        self._pow = array('H', bytes(2 * size))
+        self._wr_idx = 0
+        self._count = 0
+        # bound method created once, the timer callback must not allocate
+        self._sample_ref = self._sample
+        from machine import Timer
+        self._timer = Timer(timer_id)
+        self._timer.init(period=period_ms, mode=Timer.PERIODIC, callback=self._sample_isr)
+
+    def stop_sampling(self):
+        """Stop the background sampling started by start_sampling."""
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
+
+    def _sample_isr(self, timer):
+        """Timer callback, defers the I2C transfer out of interrupt context."""
+        micropython.schedule(self._sample_ref, None)
+
+    def _sample(self, _):
+        """Read one sample into the ring buffer."""
+        current, voltage, power = self._read_all_raw(self._sample_data, self._sample_slots)
+        cur = self._cur
+        idx = self._wr_idx
+        cur[idx] = current
+        self._vol[idx] = voltage
+        self._pow[idx] = power
+        size = len(cur)
+        self._wr_idx = (idx + 1) % size
+        if self._count < size:
+            self._count += 1
+
+    def latest(self):
+        """The most recent background sample, None before the first one.
+        :return: (current in mA, voltage in V, power in mW)
+        """
+        if not self._count:
+            return None
+        idx = self._wr_idx - 1
+        return (_to_current(self._cur[idx]), _to_voltage(self._vol[idx]),
+                _to_power(self._pow[idx]))
+
+    def samples(self):
+        """The raw samples of the background sampler, None before start_sampling.
+
+        Returns the sampler's three array('H') buffers themselves, not a copy,
+        so they keep changing while sampling; copy them or call stop_sampling
+        first for a consistent snapshot. Sample k (0 is the oldest) is at
+        index (start + k) % len(current). The values are raw register values:
+        current in two's complement with 1.25 mA per LSB, voltage 1.25 mV per
+        LSB and power 10 mW per LSB.
+        :return: (current, voltage, power, start, count)
+        """
+        cur = self._cur
+        if cur is None:
+            return None
+        count = self._count
+        start = (self._wr_idx - count) % len(cur)
+        return cur, self._vol, self._pow, start, count
 
     @property
     def current(self):
-        """The current (between V+ and V-) in mA"""
-        raw = self._issue_measurement(_REG_CURRENT)
-        raw *= 1.25
-        if raw >36000:
-            raw=0
-        return int(raw//1)
+        """The current (between V+ and V-) in mA, negative if it flows from V- to V+"""
+        return _to_current(self._issue_measurement(_REG_CURRENT))
 
     @property
     def voltage(self):
         """The bus voltage in V"""
-        raw = self._issue_measurement(_REG_BUSVOLTAGE)
-        return round(raw * 0.00125,2)
+        return _to_voltage(self._issue_measurement(_REG_BUSVOLTAGE))
 
     @property
     def power(self):
         """The power being delivered to the load in mW"""
-
-        raw = self._issue_measurement(_REG_POWER)
-        return round(raw * 10,0)
+        return _to_power(self._issue_measurement(_REG_POWER))
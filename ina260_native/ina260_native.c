@@ -0,0 +1,106 @@
+/*
+ * ina260_native
+ * ------------------------
+ * Optional MicroPython user C module for ina260.py.
+ * Reads the current, bus voltage and power registers of an INA260 in one
+ * call and returns the raw register values. Scaling is done by ina260.py.
+ *
+ * GitHub: https://github.com/ldreesden/ina260
+ */
+
+#include "py/mperrno.h"
+#include "py/runtime.h"
+#include "extmod/modmachine.h"
+
+#define INA260_REG_CURRENT (0x01)
+#define INA260_REG_POWER (0x03)
+
+// Write the register pointer and read the 16 bit register, the same way
+// readfrom_mem does in extmod/machine_i2c.c.
+static int ina260_read_reg(mp_obj_base_t *i2c, const mp_machine_i2c_p_t *i2c_p,
+    uint16_t addr, uint8_t reg, uint8_t *buf) {
+    #if MICROPY_PY_MACHINE_I2C_TRANSFER_WRITE1
+    // Pointer write and read in one transaction with a repeated start.
+    mp_machine_i2c_buf_t bufs[2] = {
+        {.len = 1, .buf = &reg},
+        {.len = 2, .buf = buf},
+    };
+    return i2c_p->transfer(i2c, addr, 2, bufs,
+        MP_MACHINE_I2C_FLAG_WRITE1 | MP_MACHINE_I2C_FLAG_READ | MP_MACHINE_I2C_FLAG_STOP);
+    #else
+    // The port cannot combine a write and a read in one transfer call, so
+    // write the pointer without a STOP and read in a second transfer.
+    mp_machine_i2c_buf_t wbuf = {.len = 1, .buf = &reg};
+    int ret = i2c_p->transfer(i2c, addr, 1, &wbuf, 0);
+    if (ret != 1) {
+        // The write was not completed, but a STOP must still be generated
+        // to release the bus.
+        mp_machine_i2c_buf_t stop = {.len = 0, .buf = NULL};
+        i2c_p->transfer(i2c, addr, 1, &stop, MP_MACHINE_I2C_FLAG_STOP);
+        return ret < 0 ? ret : -MP_ENODEV;
+    }
+    mp_machine_i2c_buf_t rbuf = {.len = 2, .buf = buf};
+    return i2c_p->transfer(i2c, addr, 1, &rbuf, MP_MACHINE_I2C_FLAG_READ | MP_MACHINE_I2C_FLAG_STOP);
+    #endif
+}
+
+// True if obj is a machine.I2C or machine.SoftI2C object.
+static bool ina260_is_i2c(mp_obj_t obj) {
+    if (!mp_obj_is_obj(obj)) {
+        return false;
+    }
+    const mp_obj_type_t *type = mp_obj_get_type(obj);
+    #if MICROPY_PY_MACHINE_I2C
+    if (type == &machine_i2c_type) {
+        return true;
+    }
+    #endif
+    #if MICROPY_PY_MACHINE_SOFTI2C
+    if (type == &mp_machine_soft_i2c_type) {
+        return true;
+    }
+    #endif
+    return false;
+}
+
+// is_i2c(obj) -> bool, whether read_all can use obj.
+static mp_obj_t ina260_native_is_i2c(mp_obj_t obj) {
+    return mp_obj_new_bool(ina260_is_i2c(obj));
+}
+static MP_DEFINE_CONST_FUN_OBJ_1(ina260_native_is_i2c_obj, ina260_native_is_i2c);
+
+// read_all(i2c, addr) -> (current, voltage, power) as raw register values.
+static mp_obj_t ina260_native_read_all(mp_obj_t i2c_in, mp_obj_t addr_in) {
+    if (!ina260_is_i2c(i2c_in)) {
+        mp_raise_TypeError(MP_ERROR_TEXT("expecting an I2C object"));
+    }
+    mp_obj_base_t *i2c = (mp_obj_base_t *)MP_OBJ_TO_PTR(i2c_in);
+    const mp_machine_i2c_p_t *i2c_p =
+        (const mp_machine_i2c_p_t *)MP_OBJ_TYPE_GET_SLOT(i2c->type, protocol);
+    uint16_t addr = mp_obj_get_int(addr_in);
+    uint8_t buf[2];
+    mp_obj_t items[3];
+    for (uint8_t reg = INA260_REG_CURRENT; reg <= INA260_REG_POWER; ++reg) {
+        int ret = ina260_read_reg(i2c, i2c_p, addr, reg, buf);
+        if (ret < 0) {
+            mp_raise_OSError(-ret);
+        }
+        items[reg - INA260_REG_CURRENT] = MP_OBJ_NEW_SMALL_INT((buf[0] << 8) | buf[1]);
+    }
+    return mp_obj_new_tuple(3, items);
+}
+static MP_DEFINE_CONST_FUN_OBJ_2(ina260_native_read_all_obj, ina260_native_read_all);
+
+static const mp_rom_map_elem_t ina260_native_module_globals_table[] = {
+    { MP_ROM_QSTR(MP_QSTR___name__), MP_ROM_QSTR(MP_QSTR_ina260_native) },
+    { MP_ROM_QSTR(MP_QSTR_is_i2c), MP_ROM_PTR(&ina260_native_is_i2c_obj) },
+    { MP_ROM_QSTR(MP_QSTR_read_all), MP_ROM_PTR(&ina260_native_read_all_obj) },
+};
+static MP_DEFINE_CONST_DICT(ina260_native_module_globals, ina260_native_module_globals_table);
+
+const mp_obj_module_t ina260_native_user_cmodule = {
+    .base = { &mp_type_module },
+    .globals = (mp_obj_dict_t *)&ina260_native_module_globals,
+};
+
+MP_REGISTER_MODULE(MP_QSTR_ina260_native, ina260_native_user_cmodule);
@@ -0,0 +1,11 @@
+add_library(usermod_ina260_native INTERFACE)
+
+target_sources(usermod_ina260_native INTERFACE
+    ${CMAKE_CURRENT_LIST_DIR}/ina260_native.c
+)
+
+target_include_directories(usermod_ina260_native INTERFACE
+    ${CMAKE_CURRENT_LIST_DIR}
+)
+
+target_link_libraries(usermod INTERFACE usermod_ina260_native)
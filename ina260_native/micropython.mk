@@ -0,0 +1,5 @@
+INA260_NATIVE_MOD_DIR := $(USERMOD_DIR)
+
+SRC_USERMOD_C += $(INA260_NATIVE_MOD_DIR)/ina260_native.c
+
+CFLAGS_USERMOD += -I$(INA260_NATIVE_MOD_DIR)